@@ -4,7 +4,8 @@
 """
 
 import os
-from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Dict, Optional, Iterator
 from notion_api_client import NotionClient
 
 
@@ -22,41 +23,80 @@ class DataCollector:
     
     def collect_database_data(
         self, 
-        database_ids: Optional[List[str]] = None
-    ) -> Dict[str, List[Dict]]:
+        database_ids: Optional[List[str]] = None,
+        max_workers: int = 4,
+        page_transform: Optional[Callable[[Iterator[Dict]], List[Any]]] = None
+    ) -> Dict[str, List[Any]]:
         """
         收集指定数据库的数据
         
+        各数据库的查询是独立的网络请求，使用线程池并发执行。
+        
         Args:
             database_ids: 数据库ID列表，如果为None则收集所有可访问的数据库
+            max_workers: 并发查询的数据库数量上限（受 Notion API 速率限制约束，不宜过大）
+            page_transform: 对每个数据库的页面迭代器做的转换（可选），例如
+                EntropyCalculator.to_records；页面逐批到达时即被转换，不保留完整的原始页面列表
             
         Returns:
-            字典，key为数据库ID，value为该数据库的页面列表
+            字典，key为数据库ID，value为该数据库的页面列表（或 page_transform 的结果）
         """
-        database_pages = {}
-        
         if database_ids:
             # 收集指定数据库
-            for db_id in database_ids:
-                try:
-                    pages = self.notion_client.get_database_pages(db_id)
-                    database_pages[db_id] = pages
-                except Exception as e:
-                    print(f"警告：无法访问数据库 {db_id}: {e}")
+            targets = [(db_id, None) for db_id in database_ids]
         else:
             # 收集所有数据库
             databases = self.notion_client.get_all_databases()
-            for db in databases:
-                db_id = db.get('id')
-                data_source_id = db.get('data_source_id')
+            targets = [(db.get('id'), db.get('data_source_id')) for db in databases]
+        
+        def _collect(db_id: str, data_source_id: Optional[str]) -> List[Any]:
+            pages = self.notion_client.iter_database_pages(db_id, data_source_id)
+            return page_transform(pages) if page_transform else list(pages)
+        
+        database_pages = {}
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                (db_id, executor.submit(_collect, db_id, data_source_id))
+                for db_id, data_source_id in targets
+            ]
+            # 按提交顺序取结果，保证返回的数据库顺序与串行收集一致
+            for db_id, future in futures:
                 try:
-                    pages = self.notion_client.get_database_pages(db_id, data_source_id)
-                    database_pages[db_id] = pages
+                    database_pages[db_id] = future.result()
                 except Exception as e:
                     print(f"警告：无法访问数据库 {db_id}: {e}")
         
         return database_pages
     
+    def iter_database_pages(
+        self,
+        database_ids: Optional[List[str]] = None
+    ) -> Iterator[Dict]:
+        """
+        逐个产出数据库中的页面，而不是一次性返回所有数据库的页面列表
+        
+        数据库按顺序依次查询，页面逐批请求、逐个产出，同一时间只持有一批原始页面，
+        可直接交给 EntropyCalculator.compute_all_streaming 消费。
+        
+        Args:
+            database_ids: 数据库ID列表，如果为None则遍历所有可访问的数据库
+            
+        Yields:
+            页面对象
+        """
+        if database_ids:
+            targets = [(db_id, None) for db_id in database_ids]
+        else:
+            databases = self.notion_client.get_all_databases()
+            targets = [(db.get('id'), db.get('data_source_id')) for db in databases]
+        
+        for db_id, data_source_id in targets:
+            try:
+                yield from self.notion_client.iter_database_pages(db_id, data_source_id)
+            except Exception as e:
+                print(f"警告：无法访问数据库 {db_id}: {e}")
+    
     def collect_all_pages(self) -> List[Dict]:
         """
         收集所有可访问的页面
@@ -77,11 +117,14 @@ class DataCollector:
             数据库信息字典
         """
         try:
-            # 使用 request 方法获取数据库信息
-            database = self.notion_client.client.request(
-                method="get",
-                path=f"databases/{database_id}"
-            )
+            # 优先使用搜索 / 解析 data_source 时已取得的数据库对象，避免重复请求
+            database = self.notion_client.get_cached_database_info(database_id)
+            if database is None:
+                # 使用 request 方法获取数据库信息
+                database = self.notion_client.client.request(
+                    method="get",
+                    path=f"databases/{database_id}"
+                )
             return {
                 'id': database.get('id'),
                 'title': self._get_database_title(database),
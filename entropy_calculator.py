@@ -3,13 +3,183 @@
 实现多种数据熵增指标的计算逻辑
 """
 
+import asyncio
+from bisect import bisect_right
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Tuple, Optional
+import heapq
+from itertools import repeat
+import math
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator, Union
 import random
-import httpx
 from notion_api_client import NotionClient
 
 
+def _parse_notion_ts(last_edited: str) -> datetime:
+    """
+    解析 Notion 返回的 ISO 8601 时间字符串
+    
+    Notion 时间戳固定以 'Z' 结尾（如 2024-01-01T08:00:00.000Z），
+    直接截掉后缀再设置 UTC 时区，避免 replace 产生新字符串。
+    """
+    if last_edited.endswith('Z'):
+        return datetime.fromisoformat(last_edited[:-1]).replace(tzinfo=timezone.utc)
+    return datetime.fromisoformat(last_edited.replace('Z', '+00:00'))
+
+
+def _bucket_counts(sorted_ages: List[int], thresholds: List[int]) -> List[int]:
+    """
+    统计超过各阈值天数的页面数
+    
+    Args:
+        sorted_ages: 升序排列的未更新天数数组
+        thresholds: 阈值天数列表
+        
+    Returns:
+        与 thresholds 一一对应的计数（days_old > 阈值）
+    """
+    n = len(sorted_ages)
+    return [n - bisect_right(sorted_ages, t) for t in thresholds]
+
+
+def _always_filled(prop_value: Dict) -> bool:
+    return True
+
+
+# 各属性类型判断“是否有值”的规则，按类型直接查表
+_PROPERTY_FILLED_CHECKS = {
+    'title': lambda v: bool(v.get('title', [])),
+    'rich_text': lambda v: bool(v.get('rich_text', [])),
+    'number': lambda v: v.get('number') is not None,
+    'select': lambda v: v.get('select') is not None,
+    'multi_select': lambda v: bool(v.get('multi_select', [])),
+    'date': lambda v: v.get('date') is not None,
+    'checkbox': _always_filled,  # checkbox 总是有值
+    'url': lambda v: bool(v.get('url')),
+    'email': lambda v: bool(v.get('email')),
+    'phone_number': lambda v: bool(v.get('phone_number')),
+    'relation': lambda v: bool(v.get('relation', [])),
+    'files': lambda v: bool(v.get('files', [])),
+    # 系统属性总是有值
+    'created_time': _always_filled,
+    'last_edited_time': _always_filled,
+    'created_by': _always_filled,
+    'last_edited_by': _always_filled,
+    'formula': _always_filled,  # 公式总是有值
+    'rollup': _always_filled,  # 汇总总是有值
+}
+
+
+# 计入连接密度的 mention 类型
+_PAGE_MENTION_TYPES = frozenset({'page', 'database'})
+
+# 多窗口衰减中每个阈值最多列出的页面数
+_OLDEST_PAGES_LIMIT = 50
+
+# 视为“分类”的属性类型
+_CATEGORY_PROP_TYPES = ('select', 'multi_select', 'relation')
+
+
+@dataclass
+class PageRecord:
+    """
+    页面的精简表示：只保留各指标用到的字段
+    
+    原始页面对象包含全部属性的嵌套 JSON，体积较大；采集完成后将其投影为 PageRecord，
+    属性相关的判断（完整度、是否已分类、关系目标）在投影时一次完成，随后即可释放原始页面。
+    标题只保存标题属性的 rich text 数组，读取 title 时才拼接，只有被列入报告的页面需要拼接。
+    """
+    __slots__ = (
+        'id', 'last_edited_time', 'edited', 'days_old', 'title_text',
+        'relation_targets', 'has_relation_property', 'completeness', 'categorized'
+    )
+    id: Optional[str]
+    # 原始编辑时间字符串（用作页面内容缓存的键）及解析结果，缺少编辑时间时均为 None
+    last_edited_time: Optional[str]
+    edited: Optional[datetime]
+    days_old: Optional[int]
+    # 标题属性的 rich text 数组，页面没有标题属性时为 None
+    title_text: Optional[List[Dict]]
+    # 关系属性指向的页面 ID（含重复），以及页面是否有 relation 类型的属性
+    relation_targets: Tuple[Optional[str], ...]
+    has_relation_property: bool
+    # 属性完整度百分比，没有任何属性时为 None
+    completeness: Optional[float]
+    categorized: bool
+    
+    @property
+    def title(self) -> str:
+        """页面标题（按需拼接）"""
+        return _format_title(self.title_text, self.id)
+
+
+@dataclass
+class _MetricAccumulator:
+    """单次遍历页面时各指标的累加状态"""
+    total: int = 0
+    # 时间衰减 / 活跃度：所有页面的未更新天数，以及最旧的若干页面
+    # oldest 为小顶堆，元素为 (未更新天数, -页面序号, 页面记录)，同天数时先出现的页面优先保留
+    ages: List[int] = field(default_factory=list)
+    ages_sorted: bool = False
+    oldest: List[Tuple[int, int, PageRecord]] = field(default_factory=list)
+    # 链接断裂率：页面 ID（按出现顺序）-> 标题属性的 rich text 数组（输出孤立页面时才拼接）
+    page_titles: Dict[str, Optional[List[Dict]]] = field(default_factory=dict)
+    incoming_links: Counter = field(default_factory=Counter)
+    total_relations: int = 0
+    has_relation_property: bool = False
+    # 属性完整度
+    completeness_sum: float = 0.0
+    completeness_count: int = 0
+    fully_complete: int = 0
+    partially_complete: int = 0
+    mostly_empty: int = 0
+    # 分类覆盖率
+    categorized: int = 0
+    uncategorized_list: List[Dict] = field(default_factory=list)
+    
+    def merge(self, other: '_MetricAccumulator'):
+        """合并另一分片的累加结果（按分片顺序合并，保证列表顺序与串行一致）"""
+        # 对方分片的页面序号整体后移，保持全局出现顺序
+        offset = self.total
+        self.oldest = heapq.nlargest(
+            _OLDEST_PAGES_LIMIT,
+            self.oldest + [(days_old, neg_seq - offset, page) for days_old, neg_seq, page in other.oldest]
+        )
+        heapq.heapify(self.oldest)
+        self.total += other.total
+        self.ages.extend(other.ages)
+        self.ages_sorted = False
+        self.page_titles.update(other.page_titles)
+        self.incoming_links.update(other.incoming_links)
+        self.total_relations += other.total_relations
+        self.has_relation_property = self.has_relation_property or other.has_relation_property
+        self.completeness_sum += other.completeness_sum
+        self.completeness_count += other.completeness_count
+        self.fully_complete += other.fully_complete
+        self.partially_complete += other.partially_complete
+        self.mostly_empty += other.mostly_empty
+        self.categorized += other.categorized
+        self.uncategorized_list.extend(other.uncategorized_list[:20 - len(self.uncategorized_list)])
+
+
+def _accumulate_chunk(pages: List[Union[Dict, PageRecord]], now_ts: float) -> _MetricAccumulator:
+    """
+    在子进程中累加一个分片的指标（供 compute_all 多进程模式使用）
+    
+    各分片使用父进程传入的同一个当前时间计算未更新天数。
+    """
+    return EntropyCalculator(notion_client=None)._accumulate_pages(pages, now_ts)
+
+
+def _format_title(title_array: Optional[List[Dict]], page_id: Optional[str]) -> str:
+    """由标题属性的 rich text 数组生成页面标题，没有标题时返回页面ID的前8位作为标识"""
+    if title_array:
+        return ''.join([item.get('plain_text', '') for item in title_array])
+    return f"Untitled ({page_id[:8]}...)" if page_id else "Untitled"
+
+
 class EntropyCalculator:
     """熵指标计算器"""
     
@@ -21,10 +191,230 @@ class EntropyCalculator:
             notion_client: Notion API 客户端实例
         """
         self.notion_client = notion_client
+        
+        # 父数据库 ID -> 分类属性的 (名称, 类型)（同一数据库的页面共享 schema）
+        self._category_props: Dict[str, Tuple[Tuple[str, str], ...]] = {}
+    
+    def to_records(
+        self,
+        pages: Iterable[Union[Dict, PageRecord]],
+        now: Optional[datetime] = None
+    ) -> List[PageRecord]:
+        """
+        将页面投影为 PageRecord 列表
+        
+        在采集完成后对全部页面调用一次，之后即可丢弃原始页面对象；
+        各数据库及整体的计算都复用同一组记录（同一个当前时间）。
+        已经是 PageRecord 的元素原样保留。
+        
+        Args:
+            pages: 页面列表
+            now: 计算未更新天数所用的当前时间（可选，默认取当前 UTC 时间）
+            
+        Returns:
+            与输入顺序一致的页面记录列表
+        """
+        # 以浮点秒计算天数差，避免每个页面构造 timedelta
+        now_ts = (now or datetime.now(timezone.utc)).timestamp()
+        parsed = {}
+        return [self._to_record(page, now_ts, parsed) for page in pages]
+    
+    def _records_for_metric(
+        self,
+        pages: Iterable[Union[Dict, PageRecord]],
+        completeness: bool = False,
+        links: bool = False,
+        category: bool = False
+    ) -> Iterator[PageRecord]:
+        """
+        为单个 calculate_* 方法投影页面，只做该指标需要的属性判断
+        
+        未计算的字段保持默认值（completeness 为 None、relation_targets 为空、
+        categorized 为 False），这些记录只在对应方法内部使用。已经是 PageRecord 的元素原样产出。
+        
+        Args:
+            pages: 页面列表
+            completeness: 是否计算属性完整度
+            links: 是否记录关系属性的目标页面
+            category: 是否判断页面是否已分类
+            
+        Yields:
+            页面记录
+        """
+        now_ts = datetime.now(timezone.utc).timestamp()
+        parsed = {}
+        for page in pages:
+            yield self._to_record(
+                page, now_ts, parsed,
+                completeness=completeness, links=links, category=category
+            )
+    
+    def _to_record(
+        self,
+        page: Union[Dict, PageRecord],
+        now_ts: float,
+        parsed: Dict,
+        completeness: bool = True,
+        links: bool = True,
+        category: bool = True
+    ) -> PageRecord:
+        """
+        将单个页面投影为 PageRecord（见 to_records），properties 只遍历一次
+        
+        Args:
+            page: 页面对象或页面记录
+            now_ts: 当前时间的 POSIX 时间戳
+            parsed: 时间字符串 -> (datetime, 未更新天数) 的缓存
+            completeness: 是否计算属性完整度（否则为 None）
+            links: 是否记录关系属性的目标页面（否则为空）
+            category: 是否判断页面是否已分类（否则为 False）
+            
+        Returns:
+            页面记录
+        """
+        if isinstance(page, PageRecord):
+            return page
+        
+        page_id = page.get('id')
+        properties = page.get('properties', {})
+        
+        title_text = None
+        relation_targets = []
+        has_relation_property = False
+        filled_props = 0
+        
+        for prop_value in properties.values():
+            prop_type = prop_value.get('type')
+            
+            # 检查属性是否有值
+            if completeness and self._is_property_filled(prop_value, prop_type):
+                filled_props += 1
+            
+            # 关系属性的目标页面按 ID 记录，入链到汇总时再统计
+            if prop_type == 'relation':
+                has_relation_property = True
+                if links:
+                    relation_targets.extend(relation.get('id') for relation in prop_value.get('relation', []))
+            elif prop_type == 'title' and title_text is None:
+                title_text = prop_value.get('title')
+        
+        # 解析时间字符串（相同字符串复用解析结果和天数）
+        last_edited = page.get('last_edited_time')
+        if not last_edited:
+            edited, days_old = None, None
+        elif isinstance(last_edited, str):
+            cached = parsed.get(last_edited)
+            if cached is None:
+                last_edited_dt = _parse_notion_ts(last_edited)
+                cached = (last_edited_dt, int((now_ts - last_edited_dt.timestamp()) // 86400))
+                parsed[last_edited] = cached
+            edited, days_old = cached
+        else:
+            edited = last_edited
+            days_old = int((now_ts - last_edited.timestamp()) // 86400)
+        
+        return PageRecord(
+            id=page_id,
+            last_edited_time=last_edited if isinstance(last_edited, str) else None,
+            edited=edited,
+            days_old=days_old,
+            title_text=title_text,
+            relation_targets=tuple(relation_targets),
+            has_relation_property=has_relation_property,
+            completeness=(filled_props / len(properties)) * 100 if completeness and properties else None,
+            categorized=category and self._has_category(page, properties)
+        )
+    
+    def compute_all(
+        self,
+        pages: List[Union[Dict, PageRecord]],
+        thresholds: List[int] = None,
+        workers: int = 1
+    ) -> Dict:
+        """
+        一次性计算所有基于页面列表的指标（不含需要网络请求的 mention 密度）
+        
+        只遍历一次页面列表，每个页面的 properties 只读取一次，
+        各指标的累加状态保存在 _MetricAccumulator 中，最后统一汇总。
+        
+        Args:
+            pages: 页面列表（原始页面对象或 PageRecord）
+            thresholds: 多窗口衰减的阈值天数列表，默认 [30, 90, 150, 300]
+            workers: 并行进程数，大于 1 时将页面切分为连续分片并行累加；
+                页面需要在进程间序列化传输，只在页面数量很大时才划算
+            
+        Returns:
+            包含各项指标结果的字典
+        """
+        if workers > 1 and len(pages) > workers:
+            now_ts = datetime.now(timezone.utc).timestamp()
+            
+            # 连续分片（而非交错分片），合并后列表顺序与串行计算一致
+            chunk_size = -(-len(pages) // workers)
+            chunks = [pages[i:i + chunk_size] for i in range(0, len(pages), chunk_size)]
+            acc = _MetricAccumulator()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                for chunk_acc in executor.map(_accumulate_chunk, chunks, repeat(now_ts)):
+                    acc.merge(chunk_acc)
+        else:
+            acc = self._accumulate_pages(pages)
+        
+        return self._finish_all(acc, thresholds)
+    
+    def compute_all_streaming(
+        self,
+        pages: Iterable[Union[Dict, PageRecord]],
+        thresholds: List[int] = None
+    ) -> Dict:
+        """
+        以流式方式计算 compute_all 的所有指标
+        
+        逐个消费页面并更新累加器，不保留完整的页面列表：
+        每个页面投影为 PageRecord 后即被丢弃，除最旧的 50 条记录外只留下未更新天数、
+        入链计数和标题，适合配合 DataCollector.iter_database_pages 处理大型工作区。
+        
+        Args:
+            pages: 页面迭代器
+            thresholds: 多窗口衰减的阈值天数列表，默认 [30, 90, 150, 300]
+            
+        Returns:
+            与 compute_all 相同结构的指标字典
+        """
+        return self._finish_all(self._accumulate_pages(pages), thresholds)
+    
+    def _finish_all(self, acc: _MetricAccumulator, thresholds: List[int] = None) -> Dict:
+        """根据累加结果生成所有指标"""
+        return {
+            'multi_threshold_decay': self._finish_multi_threshold_decay(acc, thresholds),
+            'link_breakage': self._finish_link_breakage(acc),
+            'activity_metrics': self._finish_activity(acc),
+            'property_metrics': self._finish_property_completeness(acc),
+            'categorization_metrics': self._finish_categorization(acc)
+        }
+    
+    def _accumulate_pages(
+        self,
+        pages: Iterable[Union[Dict, PageRecord]],
+        now_ts: Optional[float] = None
+    ) -> _MetricAccumulator:
+        """单次遍历页面（列表或迭代器），逐个投影为 PageRecord 并累加所有指标"""
+        if now_ts is None:
+            now_ts = datetime.now(timezone.utc).timestamp()
+        parsed = {}
+        
+        acc = _MetricAccumulator()
+        for page in pages:
+            record = self._to_record(page, now_ts, parsed)
+            acc.total += 1
+            self._accumulate_ages(acc, record)
+            self._accumulate_links(acc, record)
+            self._accumulate_completeness(acc, record)
+            self._accumulate_categorization(acc, record)
+        return acc
     
     def calculate_time_decay_entropy(
         self, 
-        pages: List[Dict], 
+        pages: List[Union[Dict, PageRecord]], 
         threshold_days: int = 30
     ) -> Tuple[float, List[Dict]]:
         """
@@ -40,28 +430,18 @@ class EntropyCalculator:
         if not pages:
             return 0.0, []
         
-        now = datetime.now(timezone.utc)
         outdated_pages = []
         
-        for page in pages:
-            last_edited = page.get('last_edited_time')
-            if not last_edited:
+        for record in self._records_for_metric(pages):
+            days_diff = record.days_old
+            if days_diff is None:
                 continue
             
-            # 解析时间字符串
-            if isinstance(last_edited, str):
-                last_edited_dt = datetime.fromisoformat(last_edited.replace('Z', '+00:00'))
-            else:
-                last_edited_dt = last_edited
-            
-            # 计算天数差
-            days_diff = (now - last_edited_dt).days
-            
             if days_diff > threshold_days:
                 outdated_pages.append({
-                    'page_id': page.get('id'),
-                    'title': self._get_page_title(page),
-                    'last_edited': last_edited_dt.strftime('%Y-%m-%d %H:%M:%S'),
+                    'page_id': record.id,
+                    'title': record.title,
+                    'last_edited': record.edited.strftime('%Y-%m-%d %H:%M:%S'),
                     'days_old': days_diff
                 })
         
@@ -71,7 +451,7 @@ class EntropyCalculator:
     
     def calculate_multi_threshold_decay(
         self, 
-        pages: List[Dict],
+        pages: List[Union[Dict, PageRecord]],
         thresholds: List[int] = None
     ) -> Dict:
         """
@@ -84,39 +464,60 @@ class EntropyCalculator:
         Returns:
             包含各阈值衰减率的字典
         """
+        acc = _MetricAccumulator()
+        for record in self._records_for_metric(pages):
+            acc.total += 1
+            self._accumulate_ages(acc, record)
+        
+        return self._finish_multi_threshold_decay(acc, thresholds)
+    
+    def _accumulate_ages(self, acc: '_MetricAccumulator', record: PageRecord):
+        """记录页面的未更新天数（acc.total 需已计入当前页面）"""
+        days_diff = record.days_old
+        if days_diff is None:
+            return
+        
+        acc.ages.append(days_diff)
+        
+        # 只保留最旧的若干页面
+        item = (days_diff, -acc.total, record)
+        if len(acc.oldest) < _OLDEST_PAGES_LIMIT:
+            heapq.heappush(acc.oldest, item)
+        elif item > acc.oldest[0]:
+            heapq.heapreplace(acc.oldest, item)
+    
+    def _sorted_ages(self, acc: '_MetricAccumulator') -> List[int]:
+        """
+        返回升序排列的未更新天数数组
+        
+        原地排序并在累加器上记录，衰减和活跃度指标共用同一次排序。
+        """
+        if not acc.ages_sorted:
+            acc.ages.sort()
+            acc.ages_sorted = True
+        return acc.ages
+    
+    def _finish_multi_threshold_decay(
+        self,
+        acc: '_MetricAccumulator',
+        thresholds: List[int] = None
+    ) -> Dict:
+        """根据累加结果生成多时间窗口衰减指标"""
         if thresholds is None:
             thresholds = [30, 90, 150, 300]
         
-        if not pages:
+        if acc.total == 0:
             return {
                 'total_pages': 0,
                 'thresholds': {t: {'count': 0, 'rate': 0.0, 'pages': []} for t in thresholds}
             }
         
-        now = datetime.now(timezone.utc)
-        total = len(pages)
-        
-        # 为每个页面计算未更新天数
-        page_ages = []
-        for page in pages:
-            last_edited = page.get('last_edited_time')
-            if not last_edited:
-                continue
-            
-            if isinstance(last_edited, str):
-                last_edited_dt = datetime.fromisoformat(last_edited.replace('Z', '+00:00'))
-            else:
-                last_edited_dt = last_edited
-            
-            days_diff = (now - last_edited_dt).days
-            page_ages.append({
-                'page': page,
-                'days_old': days_diff,
-                'last_edited': last_edited_dt.strftime('%Y-%m-%d %H:%M:%S')
-            })
+        total = acc.total
         
-        # 按天数排序（最旧的在前）
-        page_ages.sort(key=lambda x: x['days_old'], reverse=True)
+        # 升序天数数组，用二分查找代替逐阈值全量扫描
+        ages = self._sorted_ages(acc)
+        # 最旧的页面，按天数降序（同天数按出现顺序）
+        oldest = sorted(acc.oldest, reverse=True)
         
         # 计算各阈值的衰减率
         result = {
@@ -124,26 +525,29 @@ class EntropyCalculator:
             'thresholds': {}
         }
         
-        for threshold in thresholds:
-            outdated = [p for p in page_ages if p['days_old'] > threshold]
-            outdated_pages = [{
-                'page_id': p['page'].get('id'),
-                'title': self._get_page_title(p['page']),
-                'last_edited': p['last_edited'],
-                'days_old': p['days_old']
-            } for p in outdated[:50]]  # 只保留前50个
-            
+        counts = _bucket_counts(ages, thresholds)
+        
+        # oldest 降序排列，前 count 个即为超过阈值的页面；
+        # 各阈值的页面列表都是同一序列的前缀，只需构建一次（只保留前50个）
+        top_pages = [{
+            'page_id': record.id,
+            'title': record.title,
+            'last_edited': record.edited.strftime('%Y-%m-%d %H:%M:%S'),
+            'days_old': days_old
+        } for days_old, _, record in oldest[:max(counts, default=0)]]
+        
+        for threshold, count in zip(thresholds, counts):
             result['thresholds'][threshold] = {
-                'count': len(outdated),
-                'rate': (len(outdated) / total) * 100 if total > 0 else 0.0,
-                'pages': outdated_pages
+                'count': count,
+                'rate': (count / total) * 100 if total > 0 else 0.0,
+                'pages': top_pages[:count]
             }
         
         return result
     
     def calculate_link_breakage_rate(
         self, 
-        pages: List[Dict]
+        pages: List[Union[Dict, PageRecord]]
     ) -> Tuple[float, List[Dict], Dict]:
         """
         计算链接断裂率（孤立页面比例）
@@ -157,91 +561,57 @@ class EntropyCalculator:
         Returns:
             (断裂率百分比, 孤立页面列表, 统计信息)
         """
-        if not pages:
-            return 0.0, [], {'has_relations': False, 'total_relations': 0}
+        acc = _MetricAccumulator()
+        for record in self._records_for_metric(pages, links=True):
+            acc.total += 1
+            self._accumulate_links(acc, record)
         
-        # 构建页面ID到页面的映射
-        page_map = {page.get('id'): page for page in pages}
-        
-        # 统计每个页面的入链数
-        incoming_links = {}
-        total_relations = 0
-        has_relation_property = False
-        
-        for page in pages:
-            page_id = page.get('id')
-            incoming_links[page_id] = 0
-            
-            # 检查页面中的关系属性（relations）
-            properties = page.get('properties', {})
-            for prop_name, prop_value in properties.items():
-                prop_type = prop_value.get('type')
-                
-                # 检查关系属性
-                if prop_type == 'relation':
-                    has_relation_property = True
-                    relations = prop_value.get('relation', [])
-                    total_relations += len(relations)
-                    for relation in relations:
-                        target_id = relation.get('id')
-                        if target_id in incoming_links:
-                            incoming_links[target_id] += 1
+        return self._finish_link_breakage(acc)
+    
+    def _accumulate_links(self, acc: '_MetricAccumulator', record: PageRecord):
+        """统计页面的关系属性，累加入链数"""
+        # 入链按目标 ID 计数，与页面顺序无关（目标页面可能在后面才出现）
+        if record.has_relation_property:
+            acc.has_relation_property = True
+            acc.total_relations += len(record.relation_targets)
+            acc.incoming_links.update(record.relation_targets)
+        
+        acc.page_titles[record.id] = record.title_text
+    
+    def _finish_link_breakage(self, acc: '_MetricAccumulator') -> Tuple[float, List[Dict], Dict]:
+        """根据累加结果生成链接断裂率"""
+        if acc.total == 0:
+            return 0.0, [], {'has_relations': False, 'total_relations': 0}
         
         # 统计信息
         stats = {
-            'has_relations': has_relation_property,
-            'total_relations': total_relations
+            'has_relations': acc.has_relation_property,
+            'total_relations': acc.total_relations
         }
         
         # 如果数据库没有 relation 属性，返回特殊值
-        if not has_relation_property:
+        if not acc.has_relation_property:
             # 返回 -1 表示无法计算（数据库没有使用关联功能）
             return -1.0, [], stats
         
-        # 找出孤立页面（无入链）
+        # 找出孤立页面（无入链）：页面 ID 集合与被链接 ID 集合之差
         isolated_pages = []
-        for page_id, link_count in incoming_links.items():
-            if link_count == 0:
-                page = page_map.get(page_id)
-                if page:
-                    isolated_pages.append({
-                        'page_id': page_id,
-                        'title': self._get_page_title(page),
-                        'incoming_links': 0
-                    })
-        
-        breakage_rate = (len(isolated_pages) / len(pages)) * 100 if pages else 0.0
-        
-        return breakage_rate, isolated_pages, stats
-    
-    def _get_page_title(self, page: Dict) -> str:
-        """
-        获取页面标题
-        
-        Args:
-            page: 页面对象
-            
-        Returns:
-            页面标题，如果无法获取则返回 "Untitled"
-        """
-        properties = page.get('properties', {})
+        isolated_ids = acc.page_titles.keys() - acc.incoming_links.keys()
+        if isolated_ids:
+            # 按页面出现顺序输出
+            isolated_pages = [{
+                'page_id': page_id,
+                'title': _format_title(title_text, page_id),
+                'incoming_links': 0
+            } for page_id, title_text in acc.page_titles.items() if page_id in isolated_ids]
         
-        # 尝试从 properties 中获取标题
-        for prop_name, prop_value in properties.items():
-            prop_type = prop_value.get('type')
-            if prop_type == 'title':
-                title_array = prop_value.get('title', [])
-                if title_array:
-                    return ''.join([item.get('plain_text', '') for item in title_array])
+        breakage_rate = (len(isolated_pages) / acc.total) * 100
         
-        # 如果没有标题属性，尝试从其他属性获取
-        # 或者返回页面ID的前8位作为标识
-        page_id = page.get('id', '')
-        return f"Untitled ({page_id[:8]}...)" if page_id else "Untitled"
+        return breakage_rate, isolated_pages, stats
     
     def calculate_activity_metrics(
         self, 
-        pages: List[Dict]
+        pages: List[Union[Dict, PageRecord]]
     ) -> Dict:
         """
         计算活跃度指标
@@ -252,7 +622,16 @@ class EntropyCalculator:
         Returns:
             活跃度指标字典
         """
-        if not pages:
+        acc = _MetricAccumulator()
+        for record in self._records_for_metric(pages):
+            acc.total += 1
+            self._accumulate_ages(acc, record)
+        
+        return self._finish_activity(acc)
+    
+    def _finish_activity(self, acc: '_MetricAccumulator') -> Dict:
+        """根据累加结果生成活跃度指标"""
+        if acc.total == 0:
             return {
                 'total_pages': 0,
                 'active_7d': 0,
@@ -263,31 +642,13 @@ class EntropyCalculator:
                 'activity_rate_90d': 0.0
             }
         
-        now = datetime.now(timezone.utc)
-        active_7d = 0
-        active_30d = 0
-        active_90d = 0
+        # 在排序后的天数数组上一次统计各时间窗口内的页面数
+        ages = self._sorted_ages(acc)
+        active_7d, active_30d, active_90d = (
+            len(ages) - count for count in _bucket_counts(ages, (7, 30, 90))
+        )
         
-        for page in pages:
-            last_edited = page.get('last_edited_time')
-            if not last_edited:
-                continue
-            
-            if isinstance(last_edited, str):
-                last_edited_dt = datetime.fromisoformat(last_edited.replace('Z', '+00:00'))
-            else:
-                last_edited_dt = last_edited
-            
-            days_diff = (now - last_edited_dt).days
-            
-            if days_diff <= 7:
-                active_7d += 1
-            if days_diff <= 30:
-                active_30d += 1
-            if days_diff <= 90:
-                active_90d += 1
-        
-        total = len(pages)
+        total = acc.total
         return {
             'total_pages': total,
             'active_7d': active_7d,
@@ -300,7 +661,7 @@ class EntropyCalculator:
     
     def calculate_property_completeness(
         self, 
-        pages: List[Dict]
+        pages: List[Union[Dict, PageRecord]]
     ) -> Dict:
         """
         计算属性完整度
@@ -311,7 +672,34 @@ class EntropyCalculator:
         Returns:
             属性完整度指标字典
         """
-        if not pages:
+        acc = _MetricAccumulator()
+        for record in self._records_for_metric(pages, completeness=True):
+            acc.total += 1
+            self._accumulate_completeness(acc, record)
+        
+        return self._finish_property_completeness(acc)
+    
+    def _accumulate_completeness(self, acc: '_MetricAccumulator', record: PageRecord):
+        """统计单个页面的属性填写情况"""
+        acc.completeness_count += 1
+        
+        score = record.completeness
+        if score is None:
+            acc.mostly_empty += 1
+            return
+        
+        acc.completeness_sum += score
+        
+        if score >= 80:
+            acc.fully_complete += 1
+        elif score >= 30:
+            acc.partially_complete += 1
+        else:
+            acc.mostly_empty += 1
+    
+    def _finish_property_completeness(self, acc: '_MetricAccumulator') -> Dict:
+        """根据累加结果生成属性完整度指标"""
+        if acc.total == 0:
             return {
                 'avg_completeness': 0.0,
                 'fully_complete': 0,
@@ -319,90 +707,24 @@ class EntropyCalculator:
                 'mostly_empty': 0
             }
         
-        completeness_scores = []
-        fully_complete = 0
-        partially_complete = 0
-        mostly_empty = 0
-        
-        for page in pages:
-            properties = page.get('properties', {})
-            if not properties:
-                completeness_scores.append(0)
-                mostly_empty += 1
-                continue
-            
-            total_props = 0
-            filled_props = 0
-            
-            for prop_name, prop_value in properties.items():
-                prop_type = prop_value.get('type')
-                total_props += 1
-                
-                # 检查属性是否有值
-                if self._is_property_filled(prop_value, prop_type):
-                    filled_props += 1
-            
-            if total_props > 0:
-                score = (filled_props / total_props) * 100
-                completeness_scores.append(score)
-                
-                if score >= 80:
-                    fully_complete += 1
-                elif score >= 30:
-                    partially_complete += 1
-                else:
-                    mostly_empty += 1
-            else:
-                completeness_scores.append(0)
-                mostly_empty += 1
-        
-        avg = sum(completeness_scores) / len(completeness_scores) if completeness_scores else 0.0
+        count = acc.completeness_count
+        avg = acc.completeness_sum / count if count else 0.0
         
         return {
             'avg_completeness': avg,
-            'fully_complete': fully_complete,
-            'partially_complete': partially_complete,
-            'mostly_empty': mostly_empty
+            'fully_complete': acc.fully_complete,
+            'partially_complete': acc.partially_complete,
+            'mostly_empty': acc.mostly_empty
         }
     
     def _is_property_filled(self, prop_value: Dict, prop_type: str) -> bool:
         """判断属性是否有值"""
-        if prop_type == 'title':
-            return bool(prop_value.get('title', []))
-        elif prop_type == 'rich_text':
-            return bool(prop_value.get('rich_text', []))
-        elif prop_type == 'number':
-            return prop_value.get('number') is not None
-        elif prop_type == 'select':
-            return prop_value.get('select') is not None
-        elif prop_type == 'multi_select':
-            return bool(prop_value.get('multi_select', []))
-        elif prop_type == 'date':
-            return prop_value.get('date') is not None
-        elif prop_type == 'checkbox':
-            return True  # checkbox 总是有值
-        elif prop_type == 'url':
-            return bool(prop_value.get('url'))
-        elif prop_type == 'email':
-            return bool(prop_value.get('email'))
-        elif prop_type == 'phone_number':
-            return bool(prop_value.get('phone_number'))
-        elif prop_type == 'relation':
-            return bool(prop_value.get('relation', []))
-        elif prop_type == 'files':
-            return bool(prop_value.get('files', []))
-        elif prop_type in ['created_time', 'last_edited_time', 'created_by', 'last_edited_by']:
-            return True  # 系统属性总是有值
-        elif prop_type == 'formula':
-            return True  # 公式总是有值
-        elif prop_type == 'rollup':
-            return True  # 汇总总是有值
-        else:
-            return False
+        check = _PROPERTY_FILLED_CHECKS.get(prop_type)
+        return check(prop_value) if check else False
     
     def calculate_categorization_coverage(
         self, 
-        pages: List[Dict]
+        pages: List[Union[Dict, PageRecord]]
     ) -> Dict:
         """
         计算分类覆盖率（有标签/分类的页面占比）
@@ -413,54 +735,75 @@ class EntropyCalculator:
         Returns:
             分类覆盖率指标字典
         """
-        if not pages:
+        acc = _MetricAccumulator()
+        for record in self._records_for_metric(pages, category=True):
+            acc.total += 1
+            self._accumulate_categorization(acc, record)
+        
+        return self._finish_categorization(acc)
+    
+    def _category_props_for(self, page: Dict, properties: Dict) -> Tuple[Tuple[str, str], ...]:
+        """
+        获取页面中分类相关属性（select / multi_select / relation）的 (名称, 类型)
+        
+        同一数据库的页面共享 schema，因此按父数据库缓存，每个数据库只扫描一次；
+        不属于数据库的页面每次单独扫描。
+        """
+        parent = page.get('parent') or {}
+        parent_type = parent.get('type')
+        key = parent.get(parent_type) if parent_type in ('database_id', 'data_source_id') else None
+        
+        cat_props = self._category_props.get(key) if key else None
+        if cat_props is None:
+            cat_props = tuple(
+                (prop_name, prop_value.get('type')) for prop_name, prop_value in properties.items()
+                if prop_value.get('type') in _CATEGORY_PROP_TYPES
+            )
+            if key:
+                self._category_props[key] = cat_props
+        return cat_props
+    
+    def _has_category(self, page: Dict, properties: Dict) -> bool:
+        """判断单个页面是否已分类"""
+        # 只检查分类相关属性，属性值的键与类型名相同，无需再读取类型
+        for prop_name, prop_type in self._category_props_for(page, properties):
+            prop_value = properties.get(prop_name)
+            if prop_value and prop_value.get(prop_type):
+                return True
+        return False
+    
+    def _accumulate_categorization(self, acc: '_MetricAccumulator', record: PageRecord):
+        """累加单个页面的分类情况"""
+        if record.categorized:
+            acc.categorized += 1
+        elif len(acc.uncategorized_list) < 20:  # 只保留前20个
+            acc.uncategorized_list.append({
+                'page_id': record.id,
+                'title': record.title
+            })
+    
+    def _finish_categorization(self, acc: '_MetricAccumulator') -> Dict:
+        """根据累加结果生成分类覆盖率指标"""
+        if acc.total == 0:
             return {
                 'categorized_pages': 0,
                 'uncategorized_pages': 0,
                 'coverage_rate': 0.0
             }
         
-        categorized = 0
-        uncategorized_list = []
-        
-        for page in pages:
-            properties = page.get('properties', {})
-            has_category = False
-            
-            for prop_name, prop_value in properties.items():
-                prop_type = prop_value.get('type')
-                
-                # 检查分类相关属性
-                if prop_type == 'select' and prop_value.get('select'):
-                    has_category = True
-                    break
-                elif prop_type == 'multi_select' and prop_value.get('multi_select'):
-                    has_category = True
-                    break
-                elif prop_type == 'relation' and prop_value.get('relation'):
-                    has_category = True
-                    break
-            
-            if has_category:
-                categorized += 1
-            else:
-                uncategorized_list.append({
-                    'page_id': page.get('id'),
-                    'title': self._get_page_title(page)
-                })
-        
-        total = len(pages)
+        total = acc.total
         return {
-            'categorized_pages': categorized,
-            'uncategorized_pages': total - categorized,
-            'coverage_rate': (categorized / total) * 100 if total > 0 else 0.0,
-            'uncategorized_list': uncategorized_list[:20]  # 只返回前20个
+            'categorized_pages': acc.categorized,
+            'uncategorized_pages': total - acc.categorized,
+            'coverage_rate': (acc.categorized / total) * 100 if total > 0 else 0.0,
+            'uncategorized_list': acc.uncategorized_list
         }
     
     def calculate_mention_density(
         self, 
-        pages: List[Dict],
-        sample_rate: float = 0.1
+        pages: List[Union[Dict, PageRecord]],
+        sample_rate: float = 0.1,
+        max_samples: int = 50
     ) -> Dict:
         """
         计算 mention 密度（通过抽样检测页面内容中的链接）
@@ -468,6 +811,7 @@ class EntropyCalculator:
         Args:
             pages: 页面列表
             sample_rate: 抽样比例（0-1），默认10%
+            max_samples: 最多检查的页面数（控制 API 调用，与工作区大小无关）
             
         Returns:
             mention 密度指标字典
@@ -481,36 +825,22 @@ class EntropyCalculator:
                 'avg_mentions_per_page': 0.0
             }
         
-        # 抽样
-        sample_size = max(1, int(len(pages) * sample_rate))
-        sample_size = min(sample_size, 50)  # 最多检查50个页面（控制 API 调用）
-        sampled_pages = random.sample(pages, min(sample_size, len(pages)))
+        # 抽样（直接从列表中随机选取，不遍历全部页面）
+        sample_size = min(max(1, int(len(pages) * sample_rate)), max_samples, len(pages))
+        sampled_pages = random.sample(pages, sample_size)
         
         pages_with_mentions = 0
         total_mentions = 0
         
-        headers = {
-            "Authorization": f"Bearer {self.notion_client.token}",
-            "Notion-Version": "2022-06-28",
-        }
+        # 并发获取抽样页面的内容，估计值稳定后不再检查剩余页面
+        mention_counts = self.notion_client.run_async(self._fetch_mention_counts(sampled_pages))
+        for mention_count in mention_counts:
+            if mention_count > 0:
+                pages_with_mentions += 1
+                total_mentions += mention_count
         
-        for page in sampled_pages:
-            page_id = page.get('id')
-            try:
-                url = f"https://api.notion.com/v1/blocks/{page_id}/children"
-                with httpx.Client(timeout=10.0) as http_client:
-                    resp = http_client.get(url, headers=headers)
-                    if resp.status_code == 200:
-                        blocks = resp.json().get('results', [])
-                        mention_count = self._count_mentions_in_blocks(blocks)
-                        if mention_count > 0:
-                            pages_with_mentions += 1
-                            total_mentions += mention_count
-            except Exception:
-                # 忽略错误，继续处理其他页面
-                pass
-        
-        sampled = len(sampled_pages)
+        # 以实际计入的页面数（抽样顺序的前缀）为准
+        sampled = len(mention_counts)
         return {
             'sampled_pages': sampled,
             'pages_with_mentions': pages_with_mentions,
@@ -519,21 +849,80 @@ class EntropyCalculator:
             'avg_mentions_per_page': total_mentions / sampled if sampled > 0 else 0.0
         }
     
+    async def _fetch_mention_counts(
+        self,
+        pages: List[Union[Dict, PageRecord]],
+        concurrency: int = 10,
+        min_samples: int = 10,
+        rel_tolerance: float = 0.05
+    ) -> List[int]:
+        """
+        并发获取页面的子 blocks 并统计 mention 数量，估计值稳定后提前结束
+        
+        blocks 通过 NotionClient.aget_block_children 获取（共用其异步 HTTP 会话和缓存），
+        同时进行的请求数由信号量限制，获取失败的页面计为 0。
+        结果按抽样顺序（而非完成顺序）依次计入均值和方差：响应快的页面（命中缓存、
+        blocks 较少）不会抢先决定估计值，已计入的页面始终是随机样本的一个前缀。
+        当已计入至少 min_samples 个页面、且均值的标准误小于均值的 rel_tolerance 倍时，
+        取消其余请求。
+        
+        Args:
+            pages: 待检测的页面列表
+            concurrency: 同时进行的请求数
+            min_samples: 提前结束前至少完成的页面数
+            rel_tolerance: 允许的相对标准误
+            
+        Returns:
+            已计入页面的 mention 数量列表（按抽样顺序）
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _fetch(page: Union[Dict, PageRecord]) -> int:
+            if isinstance(page, PageRecord):
+                page_id, last_edited = page.id, page.last_edited_time
+            else:
+                page_id, last_edited = page.get('id'), page.get('last_edited_time')
+            async with semaphore:
+                blocks = await self.notion_client.aget_block_children(page_id, last_edited)
+            return self._count_mentions_in_blocks(blocks) if blocks else 0
+        
+        tasks = [asyncio.ensure_future(_fetch(page)) for page in pages]
+        mention_counts = []
+        mean = 0.0
+        m2 = 0.0  # Welford 算法的平方差累计
+        
+        try:
+            # 所有请求已并发发出，这里按提交顺序等待，后面的请求在此期间继续进行
+            for task in tasks:
+                mention_count = await task
+                mention_counts.append(mention_count)
+                
+                n = len(mention_counts)
+                delta = mention_count - mean
+                mean += delta / n
+                m2 += delta * (mention_count - mean)
+                
+                if min_samples <= n < len(tasks):
+                    stderr = math.sqrt(m2 / (n - 1) / n)
+                    if stderr < rel_tolerance * mean:
+                        break
+        finally:
+            # 取消剩余请求（已完成的任务不受影响）
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        
+        return mention_counts
+    
     def _count_mentions_in_blocks(self, blocks: List[Dict]) -> int:
-        """统计 blocks 中的 mention 数量"""
-        count = 0
-        for block in blocks:
-            block_type = block.get('type')
-            if block_type and block_type in block:
-                content = block.get(block_type, {})
-                rich_text = content.get('rich_text', [])
-                for text_item in rich_text:
-                    if text_item.get('type') == 'mention':
-                        mention = text_item.get('mention', {})
-                        # 只统计页面 mention
-                        if mention.get('type') in ['page', 'database']:
-                            count += 1
-        return count
+        """统计 blocks 中的 mention 数量（只统计页面 / 数据库 mention）"""
+        return sum(
+            1
+            for block in blocks
+            for text_item in block.get(block.get('type') or '', {}).get('rich_text', ())
+            if text_item.get('type') == 'mention'
+            and text_item.get('mention', {}).get('type') in _PAGE_MENTION_TYPES
+        )
     
     def calculate_health_score(
         self,
@@ -3,32 +3,302 @@ Notion API 客户端封装模块
 提供连接、认证和数据获取的基础功能
 """
 
+import asyncio
+import json
+import logging
 import os
-from typing import List, Dict, Optional
+import sqlite3
+import threading
+import time
+import zlib
+from typing import List, Dict, Optional, Iterator
 from notion_client import Client
 from dotenv import load_dotenv
 import httpx
 
+try:
+    # 可选依赖：orjson 解析大体积 JSON 明显快于标准库，未安装时回退到 json
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 # 加载环境变量
 load_dotenv()
 
+# 429 响应时按 Retry-After 等待后重试的最大次数
+_MAX_RATE_LIMIT_RETRIES = 3
+
+
+class _RateLimiter:
+    """
+    令牌桶限速器：平均每秒 rate 个请求，空闲时最多积累 burst 个令牌用于突发请求
+    
+    线程（同步请求）与协程（异步请求）共用同一个桶。
+    """
+    
+    def __init__(self, rate: float, burst: int):
+        self._interval = 1.0 / rate
+        self._burst = burst
+        self._lock = threading.Lock()
+        # 下一个令牌的理论发放时刻
+        self._next = 0.0
+    
+    def _reserve(self) -> float:
+        """预留一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next, now - (self._burst - 1) * self._interval)
+            self._next = slot + self._interval
+            return max(0.0, slot - now)
+    
+    def acquire(self, request: Optional[httpx.Request] = None):
+        """阻塞直到获得令牌（可直接用作 httpx 的 request 事件钩子）"""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+    
+    async def aacquire(self):
+        """异步等待直到获得令牌"""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
 
 class NotionClient:
     """Notion API 客户端封装类"""
     
-    def __init__(self, token: Optional[str] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        cache_path: Optional[str] = None,
+        rate_limit: float = 3.0
+    ):
         """
         初始化 Notion 客户端
         
         Args:
             token: Notion Integration Token，如果为 None 则从环境变量读取
+            cache_path: 页面内容缓存（SQLite）文件路径，默认为 None，即不启用缓存
+            rate_limit: 所有请求合计的平均速率上限（次/秒），Notion API 限制约为 3 次/秒
         """
         self.token = token or os.getenv('NOTION_TOKEN')
         if not self.token:
             raise ValueError("NOTion Token 未设置，请在 .env 文件中设置 NOTION_TOKEN 或传入 token 参数")
         
+        # 所有请求（同步 / 异步、新旧版本 API）共用的限速器，避免并发请求触发 429
+        self._rate_limiter = _RateLimiter(rate_limit, burst=max(1, int(rate_limit)))
+        
         # 使用新版本 API (2025-09-03) 以支持 data_source
-        self.client = Client(auth=self.token, notion_version="2025-09-03")
+        # SDK（notion-client 3.1.0 起）自身会在 429 时按 Retry-After 重试；限速通过 httpx 的请求钩子接入
+        self.client = Client(
+            auth=self.token, notion_version="2025-09-03",
+            client=self._new_sync_http()
+        )
+        # 旧版 API 客户端，仅用于没有 data_source 的数据库的回退查询。
+        # 每次构造 Client 都会给共享的 notion_client logger 再挂一个输出 handler，
+        # 因此复用 self.client 的 logger，避免 SDK 日志重复输出
+        self._legacy_client = Client(
+            auth=self.token, notion_version="2022-06-28",
+            client=self._new_sync_http(), logger=self.client.logger
+        )
+        # 数据库第一次 data_source 查询使用的客户端（与 self.client 共用 HTTP 会话）。
+        # 该请求失败会回退到旧版 API 并由本模块给出警告，SDK 的请求失败日志只在 ERROR 级别输出
+        self._probe_client = Client(
+            auth=self.token, notion_version="2025-09-03",
+            client=self.client.client,
+            logger=self.client.logger.getChild('probe'), log_level=logging.ERROR
+        )
+        
+        # 页面内容请求使用的异步 HTTP 会话，按需创建。
+        # AsyncClient 的连接绑定在事件循环上，因此同时持有一个专用事件循环。
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._async_http: Optional[httpx.AsyncClient] = None
+        
+        # 数据库 ID -> data_source_id（None 表示该数据库没有 data_source，需走旧版 API）
+        self._data_source_ids: Dict[str, Optional[str]] = {}
+        
+        # 数据库 ID -> 数据库对象（含 title、created_time 等），供获取数据库信息时复用
+        self._db_info_cache: Dict[str, Dict] = {}
+        
+        # 页面内容（子 blocks）的本地缓存，页面的 last_edited_time 未变化时直接复用
+        self._cache: Optional[sqlite3.Connection] = None
+        self._cache_lock = threading.Lock()
+        # 待写入缓存的记录 (id, last_edited, blob)，由 flush_cache 一次性写入
+        self._pending_cache_rows: List[tuple] = []
+        if cache_path:
+            try:
+                self._cache = sqlite3.connect(cache_path, check_same_thread=False)
+                self._cache.execute("PRAGMA journal_mode=WAL")
+                self._cache.execute(
+                    "CREATE TABLE IF NOT EXISTS pages "
+                    "(id TEXT PRIMARY KEY, last_edited TEXT, blob BLOB)"
+                )
+                self._cache.commit()
+            except sqlite3.Error as e:
+                print(f"警告：无法打开缓存文件 {cache_path}，将不使用缓存: {e}")
+                self._cache = None
+    
+    def close(self):
+        """关闭 HTTP 会话、事件循环及缓存（先提交尚未提交的缓存写入）"""
+        self.client.close()
+        self._legacy_client.close()
+        if self._loop is not None:
+            if self._async_http is not None:
+                self._loop.run_until_complete(self._async_http.aclose())
+                self._async_http = None
+            self._loop.close()
+            self._loop = None
+        if self._cache is not None:
+            self.flush_cache()
+            self._cache.close()
+            self._cache = None
+    
+    def _new_sync_http(self) -> httpx.Client:
+        """创建发送前先经过限速器的同步 HTTP 会话（供 SDK 客户端使用）"""
+        return httpx.Client(event_hooks={'request': [self._rate_limiter.acquire]})
+    
+    def run_async(self, coro):
+        """
+        在客户端专用的事件循环中运行协程（如并发调用 aget_block_children）
+        
+        Args:
+            coro: 待运行的协程
+            
+        Returns:
+            协程的返回值
+        """
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+        try:
+            return self._loop.run_until_complete(coro)
+        finally:
+            # 协程运行期间的缓存写入在此一次性提交
+            self.flush_cache()
+    
+    def _get_async_http(self) -> httpx.AsyncClient:
+        """获取（必要时创建）共享的异步 HTTP 会话"""
+        if self._async_http is None:
+            self._async_http = httpx.AsyncClient(
+                headers={
+                    "Authorization": f"Bearer {self.token}",
+                    "Notion-Version": "2022-06-28",
+                },
+                limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                timeout=10.0
+            )
+        return self._async_http
+    
+    async def aget_block_children(
+        self,
+        page_id: str,
+        last_edited_time: Optional[str] = None
+    ) -> Optional[List[Dict]]:
+        """
+        异步获取页面的子 blocks（第一页），需在 run_async 运行的协程中调用
+        
+        页面的 last_edited_time 与缓存记录一致时直接返回缓存，不发请求。
+        请求前经过限速器；遇到 429 时按 Retry-After 等待后重试。
+        
+        Args:
+            page_id: 页面 ID
+            last_edited_time: 页面当前的 last_edited_time（可选，用于缓存）
+            
+        Returns:
+            blocks 列表，请求失败时返回 None
+        """
+        blocks = self.get_cached_blocks(page_id, last_edited_time)
+        if blocks is not None:
+            return blocks
+        
+        try:
+            url = f"https://api.notion.com/v1/blocks/{page_id}/children"
+            for attempt in range(_MAX_RATE_LIMIT_RETRIES + 1):
+                await self._rate_limiter.aacquire()
+                resp = await self._get_async_http().get(url)
+                if resp.status_code != 429 or attempt == _MAX_RATE_LIMIT_RETRIES:
+                    break
+                await asyncio.sleep(self._retry_after(resp))
+            if resp.status_code != 200:
+                return None
+            blocks = _json_loads(resp.content).get('results', [])
+        except Exception:
+            return None
+        
+        self.cache_blocks(page_id, last_edited_time, blocks)
+        return blocks
+    
+    @staticmethod
+    def _retry_after(resp: httpx.Response) -> float:
+        """读取 429 响应的 Retry-After（秒），缺失或无法解析时等待 1 秒"""
+        try:
+            return max(0.0, float(resp.headers.get('retry-after', 1)))
+        except ValueError:
+            return 1.0
+    
+    def get_cached_blocks(self, page_id: str, last_edited_time: Optional[str]) -> Optional[List[Dict]]:
+        """
+        读取缓存的页面子 blocks
+        
+        Args:
+            page_id: 页面 ID
+            last_edited_time: 页面当前的 last_edited_time
+            
+        Returns:
+            缓存的 blocks 列表；未命中、页面已被修改或缓存记录无法读取时返回 None
+        """
+        if self._cache is None or not last_edited_time:
+            return None
+        try:
+            with self._cache_lock:
+                row = self._cache.execute(
+                    "SELECT last_edited, blob FROM pages WHERE id = ?", (page_id,)
+                ).fetchone()
+            if row is None or row[0] != last_edited_time:
+                return None
+            return _json_loads(zlib.decompress(row[1]))
+        except (sqlite3.Error, zlib.error, ValueError):
+            # 缓存损坏或被其他进程锁定时视为未命中，重新请求
+            return None
+    
+    def cache_blocks(self, page_id: str, last_edited_time: Optional[str], blocks: List[Dict]):
+        """
+        写入页面子 blocks 缓存（覆盖该页面的旧记录）
+        
+        记录先暂存在内存中，由 flush_cache 在一个短事务中统一写入（run_async 返回及
+        close 时自动调用），避免在事件循环中逐页提交，也不会在网络请求期间持有写锁。
+        
+        Args:
+            page_id: 页面 ID
+            last_edited_time: 页面当前的 last_edited_time
+            blocks: 页面的子 blocks 列表
+        """
+        if self._cache is None or not last_edited_time:
+            return
+        blob = zlib.compress(json.dumps(blocks, ensure_ascii=False).encode('utf-8'))
+        with self._cache_lock:
+            self._pending_cache_rows.append((page_id, last_edited_time, blob))
+    
+    def flush_cache(self):
+        """
+        将暂存的缓存记录写入并提交
+        
+        写入失败（如缓存文件被其他进程锁定）时只给出警告并丢弃这批记录，不影响检测结果。
+        """
+        if self._cache is None:
+            return
+        with self._cache_lock:
+            rows, self._pending_cache_rows = self._pending_cache_rows, []
+            if not rows:
+                return
+            try:
+                with self._cache:
+                    self._cache.executemany(
+                        "INSERT OR REPLACE INTO pages (id, last_edited, blob) VALUES (?, ?, ?)",
+                        rows
+                    )
+            except sqlite3.Error as e:
+                print(f"警告：写入页面内容缓存失败，本次结果不会被缓存: {e}")
     
     def get_all_databases(self) -> List[Dict]:
         """
@@ -86,109 +356,161 @@ class NotionClient:
             key = (database_id, data_source_id)
             if key not in seen_combinations:
                 seen_combinations.add(key)
+                # 记录 data_source_id，后续按数据库 ID 查询时无需再解析
+                self._data_source_ids.setdefault(database_id, data_source_id)
                 # 构建数据库对象，包含 data_source_id 信息
                 db_obj = {
                     'id': database_id,
                     'data_source_id': data_source_id,
                     'title': data_source.get('title', []),
                     'properties': data_source.get('properties', {}),
+                    'created_time': data_source.get('created_time'),
+                    'last_edited_time': data_source.get('last_edited_time'),
                     'object': 'database'
                 }
                 databases.append(db_obj)
+                self._db_info_cache.setdefault(database_id, db_obj)
         
         return databases
     
-    def get_database_pages(self, database_id: str, data_source_id: Optional[str] = None) -> List[Dict]:
+    def resolve_data_source_id(self, database_id: str) -> Optional[str]:
         """
-        获取指定数据库的所有页面
+        获取数据库对应的 data_source_id
+        
+        优先使用 get_all_databases 或之前解析记录下的结果，
+        只有未知的数据库才会请求 GET /databases/{id}，且结果会被记住。
+        
+        Args:
+            database_id: 数据库 ID
+            
+        Returns:
+            data_source_id，数据库没有 data_source 或获取失败时返回 None
+        """
+        if database_id in self._data_source_ids:
+            return self._data_source_ids[database_id]
+        
+        try:
+            # 使用 request 方法获取数据库信息
+            db_info = self.client.request(
+                method="get",
+                path=f"databases/{database_id}"
+            )
+            self._db_info_cache[database_id] = db_info
+            data_sources = db_info.get('data_sources', [])
+            # 使用第一个 data_source；如果没有 data_source，使用旧版 API
+            data_source_id = data_sources[0].get('id') if data_sources else None
+        except Exception as e:
+            # 如果获取失败，尝试使用旧版 API（不记录，下次重新解析）
+            print(f"警告：无法获取数据库 {database_id} 的 data_source 信息: {e}")
+            return None
+        
+        self._data_source_ids[database_id] = data_source_id
+        return data_source_id
+    
+    def get_cached_database_info(self, database_id: str) -> Optional[Dict]:
+        """
+        获取已缓存的数据库对象（来自 get_all_databases 或 data_source 解析时的请求）
+        
+        Args:
+            database_id: 数据库 ID
+            
+        Returns:
+            数据库对象，未缓存时返回 None
+        """
+        return self._db_info_cache.get(database_id)
+    
+    def get_database_pages(self, database_id: str, data_source_id: Optional[str] = None,
+                           filter_properties: Optional[List[str]] = None) -> List[Dict]:
+        """
+        获取指定数据库的所有页面（iter_database_pages 的列表形式）
         
         Args:
             database_id: 数据库 ID
             data_source_id: 数据源 ID（可选，如果不提供则从数据库获取）
+            filter_properties: 只返回这些属性 ID（可选，None 表示返回全部属性）
             
         Returns:
             页面列表
         """
-        # 如果没有提供 data_source_id，先获取数据库信息以获取 data_source_id
+        return list(self.iter_database_pages(database_id, data_source_id, filter_properties))
+    
+    def iter_database_pages(self, database_id: str, data_source_id: Optional[str] = None,
+                            filter_properties: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        逐页请求并产出指定数据库的页面，同一时间只持有一批（最多 100 个）原始页面
+        
+        只有第一次查询请求失败时才会回退到旧版 API；
+        已产出部分页面后的请求失败会直接抛出，避免重复产出页面。
+        
+        Args:
+            database_id: 数据库 ID
+            data_source_id: 数据源 ID（可选，如果不提供则从数据库获取）
+            filter_properties: 只返回这些属性 ID（可选，None 表示返回全部属性）
+            
+        Yields:
+            页面对象
+        """
+        # 如果没有提供 data_source_id，使用已知的或解析得到的 data_source_id
         if not data_source_id:
-            try:
-                # 使用 request 方法获取数据库信息
-                db_info = self.client.request(
-                    method="get",
-                    path=f"databases/{database_id}"
-                )
-                data_sources = db_info.get('data_sources', [])
-                if data_sources:
-                    # 使用第一个 data_source
-                    data_source_id = data_sources[0].get('id')
-                else:
-                    # 如果没有 data_source，尝试使用旧版 API
-                    data_source_id = None
-            except Exception as e:
-                # 如果获取失败，尝试使用旧版 API
-                print(f"警告：无法获取数据库 {database_id} 的 data_source 信息: {e}")
-                data_source_id = None
+            data_source_id = self.resolve_data_source_id(database_id)
         
-        pages = []
-        has_more = True
-        start_cursor = None
+        # filter_properties 以查询参数传递，服务端只返回指定属性以缩小响应体
+        query = {'filter_properties': filter_properties} if filter_properties else None
         
+        batches = None
         # 优先使用新版本 API (data_source)
         if data_source_id:
+            batches = self._iter_query(
+                self.client, f"data_sources/{data_source_id}/query", query,
+                first_client=self._probe_client
+            )
             try:
-                # 使用直接 HTTP 请求调用新版本 API
-                headers = {
-                    "Authorization": f"Bearer {self.token}",
-                    "Notion-Version": "2025-09-03",
-                    "Content-Type": "application/json"
-                }
-                
-                while has_more:
-                    body = {}
-                    if start_cursor:
-                        body['start_cursor'] = start_cursor
-                    
-                    url = f"https://api.notion.com/v1/data-sources/{data_source_id}/query"
-                    with httpx.Client() as http_client:
-                        resp = http_client.post(url, headers=headers, json=body if body else {})
-                        resp.raise_for_status()
-                        response = resp.json()
-                    
-                    pages.extend(response.get('results', []))
-                    has_more = response.get('has_more', False)
-                    start_cursor = response.get('next_cursor')
+                first_batch = next(batches)
             except Exception as e:
                 # 如果新 API 失败，回退到旧版 API
                 print(f"警告：使用 data_source API 失败，回退到 database API: {e}")
-                data_source_id = None
+                batches = None
         
-        # 回退到旧版 API（兼容性）- 使用直接 HTTP 请求
-        if not data_source_id:
+        # 回退到旧版 API（兼容性）
+        if batches is None:
+            batches = self._iter_query(self._legacy_client, f"databases/{database_id}/query", query)
             try:
-                headers = {
-                    "Authorization": f"Bearer {self.token}",
-                    "Notion-Version": "2022-06-28",  # 使用旧版 API 版本
-                    "Content-Type": "application/json"
-                }
-                
-                while has_more:
-                    body = {}
-                    if start_cursor:
-                        body['start_cursor'] = start_cursor
-                    
-                    url = f"https://api.notion.com/v1/databases/{database_id}/query"
-                    with httpx.Client() as http_client:
-                        resp = http_client.post(url, headers=headers, json=body if body else {})
-                        resp.raise_for_status()
-                        response = resp.json()
-                    
-                    pages.extend(response.get('results', []))
-                    has_more = response.get('has_more', False)
-                    start_cursor = response.get('next_cursor')
+                first_batch = next(batches)
             except Exception as e:
                 raise Exception(f"无法查询数据库 {database_id}: {e}")
         
-        return pages
+        yield from first_batch
+        for batch in batches:
+            yield from batch
+    
+    def _iter_query(self, client: Client, path: str, query: Optional[Dict],
+                    first_client: Optional[Client] = None) -> Iterator[List[Dict]]:
+        """
+        分页执行查询请求，逐批产出结果（至少产出一批，可能为空）
+        
+        Args:
+            client: 发送请求的 SDK 客户端（决定 Notion-Version）
+            path: 查询接口路径
+            query: URL 查询参数（可选）
+            first_client: 只用于第一次请求的 SDK 客户端（可选，默认为 client）
+            
+        Yields:
+            每次请求返回的页面列表
+        """
+        has_more = True
+        start_cursor = None
+        
+        while has_more:
+            body = {}
+            if start_cursor:
+                body['start_cursor'] = start_cursor
+            
+            request_client = client if start_cursor else (first_client or client)
+            response = request_client.request(path=path, method="post", query=query, body=body)
+            
+            yield response.get('results', [])
+            has_more = response.get('has_more', False)
+            start_cursor = response.get('next_cursor')
     
     def get_all_pages(self) -> List[Dict]:
         """
@@ -197,7 +519,15 @@ class NotionClient:
         Returns:
             页面列表
         """
-        pages = []
+        return list(self.iter_all_pages())
+    
+    def iter_all_pages(self) -> Iterator[Dict]:
+        """
+        逐页搜索并产出所有可访问的页面（get_all_pages 的流式形式）
+        
+        Yields:
+            页面对象
+        """
         has_more = True
         start_cursor = None
         
@@ -212,11 +542,9 @@ class NotionClient:
                     filter={"property": "object", "value": "page"}
                 )
             
-            pages.extend(response.get('results', []))
+            yield from response.get('results', [])
             has_more = response.get('has_more', False)
             start_cursor = response.get('next_cursor')
-        
-        return pages
     
     def get_page(self, page_id: str) -> Dict:
         """
@@ -5,7 +5,9 @@ Notion 数据熵增检测主脚本
 
 import os
 import sys
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
 
 # 设置输出编码为 UTF-8（Windows 兼容）
@@ -19,7 +21,7 @@ load_dotenv()
 
 from notion_api_client import NotionClient
 from data_collector import DataCollector
-from entropy_calculator import EntropyCalculator
+from entropy_calculator import EntropyCalculator, PageRecord
 from report_generator import ReportGenerator
 
 
@@ -34,6 +36,10 @@ def format_notion_id(id_str: str) -> str:
     Returns:
         格式化后的 ID（带连字符）
     """
+    # 已是 8-4-4-4-12 格式（最常见情况），无需重新拼接
+    if len(id_str) == 36 and id_str[8] == id_str[13] == id_str[18] == id_str[23] == '-':
+        return id_str
+    
     # 移除所有连字符和空格
     clean_id = id_str.replace('-', '').replace(' ', '')
     
@@ -64,6 +70,47 @@ def parse_database_ids(env_value: Optional[str]) -> Optional[List[str]]:
     return formatted_ids if formatted_ids else None
 
 
+def _process_one_db(
+    data_collector: DataCollector,
+    entropy_calculator: EntropyCalculator,
+    db_id: str,
+    pages: List[PageRecord]
+) -> Dict:
+    """
+    计算单个数据库的检测结果
+    
+    Args:
+        data_collector: 数据采集器
+        entropy_calculator: 熵指标计算器
+        db_id: 数据库ID
+        pages: 该数据库的页面记录列表
+        
+    Returns:
+        该数据库的检测结果字典
+    """
+    # 获取数据库信息
+    db_info = data_collector.get_database_info(db_id)
+    
+    # 计算多时间窗口衰减
+    multi_decay = entropy_calculator.calculate_multi_threshold_decay(
+        pages, thresholds=[30, 90, 150, 300]
+    )
+    
+    # 计算链接断裂率
+    link_breakage_rate, isolated_pages, link_stats = entropy_calculator.calculate_link_breakage_rate(
+        pages
+    )
+    
+    return {
+        'database_info': db_info,
+        'pages_count': len(pages),
+        'multi_threshold_decay': multi_decay,
+        'link_breakage_rate': link_breakage_rate,
+        'isolated_pages': isolated_pages,
+        'link_stats': link_stats
+    }
+
+
 def main():
     """主函数"""
     print("=" * 60)
@@ -81,29 +128,40 @@ def main():
     database_ids = parse_database_ids(os.getenv('DATABASE_IDS'))
     threshold_days = int(os.getenv('TIME_DECAY_THRESHOLD_DAYS', '30'))
     warning_threshold = float(os.getenv('TIME_DECAY_WARNING_THRESHOLD', '40.0'))
+    max_concurrency = max(1, int(os.getenv('NOTION_MAX_CONCURRENCY', '4')))
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    cache_path = os.getenv('NOTION_CACHE_PATH', os.path.join(base_dir, '.notion_cache.db'))
     
     print(f"配置信息:")
     print(f"  - 时间衰减阈值: {threshold_days} 天")
     print(f"  - 警告阈值: {warning_threshold}%")
+    print(f"  - 并发查询数据库数: {max_concurrency}")
+    print(f"  - 页面内容缓存: {cache_path or '未启用'}")
     if database_ids:
         print(f"  - 指定数据库数量: {len(database_ids)}")
     else:
         print(f"  - 监控范围: 所有可访问的数据库")
     print()
     
+    notion_client = None
     try:
         # 初始化组件
         print("🔌 正在连接 Notion API...")
-        notion_client = NotionClient(token=notion_token)
+        notion_client = NotionClient(token=notion_token, cache_path=cache_path)
         data_collector = DataCollector(notion_client)
         entropy_calculator = EntropyCalculator(notion_client)
         report_generator = ReportGenerator()
         print("✅ 连接成功")
         print()
         
-        # 收集数据
+        # 收集数据：页面逐批到达时即投影为精简记录，不保留完整的原始页面对象；
+        # 各数据库和整体指标共用同一组记录及同一个当前时间
         print("📊 正在收集数据...")
-        database_pages = data_collector.collect_database_data(database_ids)
+        now = datetime.now(timezone.utc)
+        database_pages = data_collector.collect_database_data(
+            database_ids, max_workers=max_concurrency,
+            page_transform=lambda pages: entropy_calculator.to_records(pages, now=now)
+        )
         
         if not database_pages:
             print("⚠️  警告: 未找到任何数据库或无法访问")
@@ -125,58 +183,38 @@ def main():
         print("🧮 正在计算熵指标...")
         database_results = {}
         all_pages = []
+        for records in database_pages.values():
+            all_pages.extend(records)
         
-        for db_id, pages in database_pages.items():
-            print(f"  处理数据库: {db_id[:8]}... ({len(pages)} 个页面)")
-            all_pages.extend(pages)
-            
-            # 获取数据库信息
-            db_info = data_collector.get_database_info(db_id)
-            
-            # 计算多时间窗口衰减
-            multi_decay = entropy_calculator.calculate_multi_threshold_decay(
-                pages, thresholds=[30, 90, 150, 300]
-            )
-            
-            # 计算链接断裂率
-            link_breakage_rate, isolated_pages, link_stats = entropy_calculator.calculate_link_breakage_rate(
-                pages
-            )
-            
-            database_results[db_id] = {
-                'database_info': db_info,
-                'pages_count': len(pages),
-                'multi_threshold_decay': multi_decay,
-                'link_breakage_rate': link_breakage_rate,
-                'isolated_pages': isolated_pages,
-                'link_stats': link_stats
-            }
+        # 各数据库互不依赖（获取数据库信息需要网络请求），使用线程池并发处理
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = []
+            for db_id, pages in database_pages.items():
+                print(f"  处理数据库: {db_id[:8]}... ({len(pages)} 个页面)")
+                futures.append((db_id, executor.submit(
+                    _process_one_db, data_collector, entropy_calculator, db_id, pages
+                )))
+            # 按提交顺序取结果，保证报告中的数据库顺序不变
+            for db_id, future in futures:
+                database_results[db_id] = future.result()
         
         print()
         
         # 计算整体指标
         print("📈 正在计算整体指标...")
         
-        # 计算多时间窗口衰减
-        print("  计算多时间窗口衰减...")
-        overall_multi_decay = entropy_calculator.calculate_multi_threshold_decay(
+        # 计算多时间窗口衰减、链接断裂率、活跃度、属性完整度、分类覆盖率
+        print("  计算衰减、活跃度、完整度与分类覆盖率...")
+        overall_metrics = entropy_calculator.compute_all(
             all_pages, thresholds=[30, 90, 150, 300]
         )
+        overall_multi_decay = overall_metrics['multi_threshold_decay']
         overall_time_decay_entropy = overall_multi_decay['thresholds'].get(30, {}).get('rate', 0)
         
-        overall_link_breakage_rate, _, overall_link_stats = entropy_calculator.calculate_link_breakage_rate(
-            all_pages
-        )
-        
-        # 计算新增指标
-        print("  计算活跃度指标...")
-        activity_metrics = entropy_calculator.calculate_activity_metrics(all_pages)
-        
-        print("  计算属性完整度...")
-        property_metrics = entropy_calculator.calculate_property_completeness(all_pages)
-        
-        print("  计算分类覆盖率...")
-        categorization_metrics = entropy_calculator.calculate_categorization_coverage(all_pages)
+        overall_link_breakage_rate, _, overall_link_stats = overall_metrics['link_breakage']
+        activity_metrics = overall_metrics['activity_metrics']
+        property_metrics = overall_metrics['property_metrics']
+        categorization_metrics = overall_metrics['categorization_metrics']
         
         print("  抽样检测连接密度...")
         mention_metrics = entropy_calculator.calculate_mention_density(all_pages, sample_rate=0.1)
@@ -222,7 +260,7 @@ def main():
         )
         
         # 保存报告到 report 目录
-        report_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report')
+        report_dir = os.path.join(base_dir, 'report')
         os.makedirs(report_dir, exist_ok=True)
         report_path = report_generator.save_report(report_content, output_dir=report_dir)
         print(f"✅ 报告已保存: {report_path}")
@@ -255,6 +293,9 @@ def main():
         import traceback
         traceback.print_exc()
         sys.exit(1)
+    finally:
+        if notion_client is not None:
+            notion_client.close()
 
 
 if __name__ == '__main__':
@@ -3,6 +3,7 @@
 生成 Markdown 格式的熵增检测报告
 """
 
+import os
 from datetime import datetime
 from typing import List, Dict, Tuple
 
@@ -59,7 +60,9 @@ class ReportGenerator:
         # 健康度评级图标
         grade_icon = {'A': '🟢', 'B': '🟡', 'C': '🟠', 'D': '🔴'}.get(health_score.get('grade', 'N/A'), '⚪')
         
-        report = f"""# Notion 数据熵增检测报告
+        # 各段落先追加到列表，最后一次性拼接，避免反复复制整份报告
+        parts: List[str] = []
+        parts.append(f"""# Notion 数据熵增检测报告
 
 **检测时间**: {timestamp}
 
@@ -91,7 +94,7 @@ class ReportGenerator:
 不同时间窗口下未更新页面的比例：
 
 | 未更新时间 | 页面数量 | 占比 | 状态 |
-|-----------|---------|------|------|"""
+|-----------|---------|------|------|""")
         
         # 添加多时间窗口的衰减数据
         thresholds_data = multi_threshold_decay.get('thresholds', {})
@@ -110,41 +113,41 @@ class ReportGenerator:
                     status = "🟡 注意"
                 else:
                     status = "🟢 正常"
-                report += f"\n| > {t} 天 | {count} | {rate:.1f}% | {status} |"
+                parts.append(f"\n| > {t} 天 | {count} | {rate:.1f}% | {status} |")
         
-        report += f"""
+        parts.append(f"""
 
 *说明：数值表示超过该天数未更新的页面比例*
 
-"""
+""")
         
         # 添加警告信息
         if overall_time_decay_entropy > warning_threshold:
-            report += f"⚠️ **警告**: 30天时间衰减熵 ({overall_time_decay_entropy:.1f}%) 超过警告阈值 ({warning_threshold}%)！建议及时清理过期内容。\n\n"
+            parts.append(f"⚠️ **警告**: 30天时间衰减熵 ({overall_time_decay_entropy:.1f}%) 超过警告阈值 ({warning_threshold}%)！建议及时清理过期内容。\n\n")
         else:
-            report += f"✅ 30天时间衰减熵 ({overall_time_decay_entropy:.1f}%) 在正常范围内。\n\n"
+            parts.append(f"✅ 30天时间衰减熵 ({overall_time_decay_entropy:.1f}%) 在正常范围内。\n\n")
         
         if overall_link_breakage_rate < 0:
-            report += f"""### 链接断裂率 (Link Breakage Rate)
+            parts.append(f"""### 链接断裂率 (Link Breakage Rate)
 - **当前值**: 无法计算
 - **说明**: 数据库未使用 relation（关联）属性
 
 ℹ️ **提示**: 链接断裂率指标需要数据库配置关联字段才能计算。如果您在 Notion 页面内容中使用 @ 提及其他页面，这种链接方式暂不纳入统计。
 
-"""
+""")
         else:
-            report += f"""### 链接断裂率 (Link Breakage Rate)
+            parts.append(f"""### 链接断裂率 (Link Breakage Rate)
 - **当前值**: {overall_link_breakage_rate:.2f}%
 - **说明**: 孤立页面（无入链）的比例
 
-"""
+""")
             if overall_link_breakage_rate > 30:
-                report += f"⚠️ **警告**: 链接断裂率较高，知识网络连接度较低。\n\n"
+                parts.append(f"⚠️ **警告**: 链接断裂率较高，知识网络连接度较低。\n\n")
             else:
-                report += f"✅ 链接断裂率在可接受范围内。\n\n"
+                parts.append(f"✅ 链接断裂率在可接受范围内。\n\n")
         
         # 添加活跃度指标
-        report += f"""### 2. 活跃度指标 (Activity Metrics)
+        parts.append(f"""### 2. 活跃度指标 (Activity Metrics)
 
 | 时间范围 | 活跃页面数 | 活跃率 |
 |---------|----------|-------|
@@ -152,27 +155,27 @@ class ReportGenerator:
 | 近30天 | {activity_metrics.get('active_30d', 0)} | {activity_metrics.get('activity_rate_30d', 0):.2f}% |
 | 近90天 | {activity_metrics.get('active_90d', 0)} | {activity_metrics.get('activity_rate_90d', 0):.2f}% |
 
-"""
+""")
         
         # 添加属性完整度
-        report += f"""### 3. 属性完整度 (Property Completeness)
+        parts.append(f"""### 3. 属性完整度 (Property Completeness)
 - **平均完整度**: {property_metrics.get('avg_completeness', 0):.2f}%
 - **完整页面（≥80%）**: {property_metrics.get('fully_complete', 0)} 个
 - **部分填写（30-80%）**: {property_metrics.get('partially_complete', 0)} 个
 - **基本为空（<30%）**: {property_metrics.get('mostly_empty', 0)} 个
 
-"""
+""")
         
         # 添加分类覆盖率
-        report += f"""### 4. 分类覆盖率 (Categorization Coverage)
+        parts.append(f"""### 4. 分类覆盖率 (Categorization Coverage)
 - **已分类页面**: {categorization_metrics.get('categorized_pages', 0)} 个
 - **未分类页面**: {categorization_metrics.get('uncategorized_pages', 0)} 个
 - **覆盖率**: {categorization_metrics.get('coverage_rate', 0):.2f}%
 
-"""
+""")
         
         # 添加连接密度
-        report += f"""### 5. 连接密度 (Link Density) - 抽样检测
+        parts.append(f"""### 5. 连接密度 (Link Density) - 抽样检测
 - **抽样页面数**: {mention_metrics.get('sampled_pages', 0)} 个
 - **含链接页面**: {mention_metrics.get('pages_with_mentions', 0)} 个
 - **总链接数**: {mention_metrics.get('total_mentions', 0)} 个
@@ -181,12 +184,12 @@ class ReportGenerator:
 
 *注：通过抽样检测页面内容中的 @mention 链接*
 
-"""
+""")
         
-        report += "---\n\n"
+        parts.append("---\n\n")
         
         # 添加各数据库的详细结果
-        report += "## 📁 数据库详细分析\n\n"
+        parts.append("## 📁 数据库详细分析\n\n")
         
         for db_id, result in database_results.items():
             db_info = result.get('database_info', {})
@@ -205,7 +208,7 @@ class ReportGenerator:
             decay_150 = decay_thresholds.get(150, {}).get('rate', 0)
             decay_300 = decay_thresholds.get(300, {}).get('rate', 0)
             
-            report += f"""### {db_title}
+            parts.append(f"""### {db_title}
 
 - **数据库ID**: `{db_id}`
 - **页面总数**: {pages_count}
@@ -217,60 +220,60 @@ class ReportGenerator:
 |-------|-------|--------|--------|
 | {decay_30:.1f}% | {decay_90:.1f}% | {decay_150:.1f}% | {decay_300:.1f}% |
 
-"""
+""")
             
             # 超过300天的页面列表（最需要关注）
             outdated_300 = decay_thresholds.get(300, {}).get('pages', [])
             if outdated_300:
-                report += f"#### ⏰ 长期未更新页面（超过 300 天）\n\n"
-                report += "| 页面标题 | 最后编辑时间 | 未更新天数 |\n"
-                report += "|---------|------------|----------|\n"
+                parts.append(f"#### ⏰ 长期未更新页面（超过 300 天）\n\n")
+                parts.append("| 页面标题 | 最后编辑时间 | 未更新天数 |\n")
+                parts.append("|---------|------------|----------|\n")
                 for page in outdated_300[:15]:  # 最多显示15个
                     title = page.get('title', 'Untitled')
                     last_edited = page.get('last_edited', 'N/A')
                     days_old = page.get('days_old', 0)
-                    report += f"| {title} | {last_edited} | {days_old} 天 |\n"
+                    parts.append(f"| {title} | {last_edited} | {days_old} 天 |\n")
                 
                 if len(outdated_300) > 15:
-                    report += f"\n*（仅显示前15个，共 {len(outdated_300)} 个）*\n"
-                report += "\n"
+                    parts.append(f"\n*（仅显示前15个，共 {len(outdated_300)} 个）*\n")
+                parts.append("\n")
             
             # 孤立页面列表
             if isolated_pages:
-                report += f"#### 🔗 孤立页面列表（无入链）\n\n"
-                report += "| 页面标题 |\n"
-                report += "|---------|\n"
+                parts.append(f"#### 🔗 孤立页面列表（无入链）\n\n")
+                parts.append("| 页面标题 |\n")
+                parts.append("|---------|\n")
                 for page in isolated_pages[:20]:  # 最多显示20个
                     title = page.get('title', 'Untitled')
-                    report += f"| {title} |\n"
+                    parts.append(f"| {title} |\n")
                 
                 if len(isolated_pages) > 20:
-                    report += f"\n*（仅显示前20个，共 {len(isolated_pages)} 个孤立页面）*\n"
-                report += "\n"
+                    parts.append(f"\n*（仅显示前20个，共 {len(isolated_pages)} 个孤立页面）*\n")
+                parts.append("\n")
             
-            report += "---\n\n"
+            parts.append("---\n\n")
         
         # 添加建议
-        report += "## 💡 建议\n\n"
+        parts.append("## 💡 建议\n\n")
         
         if overall_time_decay_entropy > warning_threshold:
-            report += f"- 建议清理超过 {threshold_days} 天未更新的过期内容\n"
-            report += "- 考虑归档或删除不再需要的信息\n"
+            parts.append(f"- 建议清理超过 {threshold_days} 天未更新的过期内容\n")
+            parts.append("- 考虑归档或删除不再需要的信息\n")
         
         if overall_link_breakage_rate > 30:
-            report += "- 建议为孤立页面添加链接关系，增强知识网络连接\n"
-            report += "- 检查是否有重要页面被遗漏链接\n"
+            parts.append("- 建议为孤立页面添加链接关系，增强知识网络连接\n")
+            parts.append("- 检查是否有重要页面被遗漏链接\n")
         elif overall_link_breakage_rate < 0:
-            report += "- 数据库未使用 relation（关联）属性，无法计算链接断裂率\n"
-            report += "- 如需统计页面间的链接关系，可在数据库中添加 relation 类型的属性\n"
+            parts.append("- 数据库未使用 relation（关联）属性，无法计算链接断裂率\n")
+            parts.append("- 如需统计页面间的链接关系，可在数据库中添加 relation 类型的属性\n")
         
         if overall_time_decay_entropy <= warning_threshold and overall_link_breakage_rate <= 30:
-            report += "- ✅ 当前数据健康度良好，继续保持！\n"
+            parts.append("- ✅ 当前数据健康度良好，继续保持！\n")
         
-        report += "\n---\n\n"
-        report += f"*报告生成时间: {timestamp}*\n"
+        parts.append("\n---\n\n")
+        parts.append(f"*报告生成时间: {timestamp}*\n")
         
-        return report
+        return "".join(parts)
     
     def save_report(self, report_content: str, output_dir: str = ".") -> str:
         """
@@ -285,10 +288,11 @@ class ReportGenerator:
         """
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         filename = f"entropy_report_{timestamp}.md"
-        filepath = f"{output_dir}/{filename}"
+        filepath = os.path.join(output_dir, filename)
         
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(report_content)
+        # 一次性编码为 UTF-8 后以二进制写入，不经过文本模式的换行转换
+        with open(filepath, 'wb') as f:
+            f.write(report_content.encode('utf-8'))
         
         return filepath
 